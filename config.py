@@ -84,6 +84,22 @@ PINTEREST_SEARCH_URL: str = os.getenv(
 # Интервал публикаций в минутах (по‑умолчанию 20)
 PUBLISH_DELAY_MINUTES: int = int(os.getenv("PUBLISH_DELAY_MINUTES", "20"))
 
+# Сколько свежих (неопубликованных) пинов набрать, прежде чем выбрать случайный
+PUBLISH_CANDIDATES: int = int(os.getenv("PUBLISH_CANDIDATES", "25"))
+
+# Пул для разбора HTML/JSON: "process" (по‑умолчанию) или "thread".
+# "thread" не даёт второго ядра (GIL): event‑loop продолжает работать,
+# пока разбор идёт в потоке, но парсинг и бот делят одно ядро.
+PARSE_EXECUTOR: str = os.getenv("PARSE_EXECUTOR", "process").strip().lower()
+if PARSE_EXECUTOR not in ("thread", "process"):
+    raise RuntimeError(f"❌ PARSE_EXECUTOR must be 'thread' or 'process', got {PARSE_EXECUTOR!r}")
+
+# Количество воркеров пула (по‑умолчанию – решает concurrent.futures)
+PARSE_WORKERS: int | None = _optional_int("PARSE_WORKERS")
+
+# Предупреждать, если event‑loop заблокирован дольше N миллисекунд
+LOOP_LAG_WARN_MS: int = int(os.getenv("LOOP_LAG_WARN_MS", "100"))
+
 
 # ----------------------------------------------------------------------
 # 6️⃣ Краткое представление (полезно при запуске скриптов)
@@ -97,3 +113,7 @@ if __name__ == "__main__":
     print(f"PORT                 : {PORT}")
     print(f"PINTEREST_SEARCH_URL : {PINTEREST_SEARCH_URL}")
     print(f"PUBLISH_DELAY_MINUTES: {PUBLISH_DELAY_MINUTES}")
+    print(f"PUBLISH_CANDIDATES   : {PUBLISH_CANDIDATES}")
+    print(f"PARSE_EXECUTOR       : {PARSE_EXECUTOR}")
+    print(f"PARSE_WORKERS        : {PARSE_WORKERS}")
+    print(f"LOOP_LAG_WARN_MS     : {LOOP_LAG_WARN_MS}")
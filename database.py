@@ -1,6 +1,7 @@
 # database.py
 import sqlite3
 import logging
+from typing import Iterable, Set
 
 DB_NAME = "bot_data.db"
 logger = logging.getLogger(__name__)
@@ -41,6 +42,30 @@ def is_published(pin_id: str) -> bool:
         return False
 
 
+def filter_unpublished(pin_ids: Iterable[str]) -> Set[str]:
+    """
+    Возвращает подмножество `pin_ids`, которые ещё НЕ опубликованы.
+    Одна выборка на всю пачку вместо запроса на каждый pin.
+    id сравниваются как строки (колонка TEXT), как и в is_published.
+    """
+    ids = list(dict.fromkeys(pin_ids))
+    if not ids:
+        return set()
+    try:
+        with sqlite3.connect(DB_NAME) as conn:
+            cur = conn.cursor()
+            keys = [str(i) for i in ids]
+            placeholders = ",".join("?" * len(keys))
+            cur.execute(
+                f"SELECT id FROM published WHERE id IN ({placeholders})", keys
+            )
+            published = {row[0] for row in cur.fetchall()}
+            return {i for i in ids if str(i) not in published}
+    except Exception as e:
+        logger.error(f"Error checking published status: {e}")
+        return set(ids)
+
+
 def mark_as_published(pin_id: str) -> None:
     """
     Записывает pin_id в базу, чтобы не публиковать повторно.
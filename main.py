@@ -1,7 +1,7 @@
 # main.py
 import asyncio
 import logging
-import random
+import multiprocessing
 import signal
 import sys
 from datetime import datetime, timedelta
@@ -11,8 +11,9 @@ from apscheduler.schedulers.background import BackgroundScheduler
 from flask import Flask
 
 import config
-from database import init_db, is_published, mark_as_published
-from parser import get_pinterest_images
+from database import init_db, mark_as_published
+from monitor import run_with_lag_monitor
+from parser import pick_random_pin, shutdown_parse_executor
 from publisher import publish_photo
 import requests  # нужен только для keep‑alive
 
@@ -59,18 +60,14 @@ async def async_publish_job() -> None:
         logger.error("BOT_TOKEN или CHANNEL_ID не заданы!")
         return
 
-    # 1️⃣ Получаем список пинов
-    items = await get_pinterest_images(config.PINTEREST_SEARCH_URL)
-    if not items:
-        logger.info("🔍 Пинов не найдено")
-        return
-
-    # 2️⃣ Выбираем непубликовавшийся
-    random.shuffle(items)
-    candidate = next((i for i in items if not is_published(i["id"])), None)
+    # 1️⃣ + 2️⃣ Берём до PUBLISH_CANDIDATES свежих пинов (обход страницы в пуле
+    #    на них и останавливается) и выбираем случайный reservoir‑sampling'ом
+    candidate = await pick_random_pin(
+        config.PINTEREST_SEARCH_URL, config.PUBLISH_CANDIDATES
+    )
 
     if not candidate:
-        logger.info("✅ Все найденные пины уже опубликованы")
+        logger.info("✅ Новых пинов не найдено (все уже опубликованы или страница пуста)")
         return
 
     # 3️⃣ Публикуем
@@ -94,7 +91,7 @@ def job_wrapper() -> None:
     try:
         loop = asyncio.new_event_loop()
         asyncio.set_event_loop(loop)
-        loop.run_until_complete(async_publish_job())
+        loop.run_until_complete(run_with_lag_monitor(async_publish_job()))
     except Exception as exc:
         logger.error(f"Ошибка в job_wrapper: {exc}", exc_info=True)
     finally:
@@ -159,6 +156,7 @@ def _shutdown(*_):
     logger.info("🛑 Получен сигнал завершения – делаем graceful‑shutdown")
     if scheduler:
         scheduler.shutdown(wait=False)
+    shutdown_parse_executor()
     if bot:
         # закрываем aiohttp‑сессию внутри Bot
         try:
@@ -183,6 +181,8 @@ if __name__ == "__main__":
     init_bot_and_scheduler()
     port = int(config.PORT) if config.PORT else 10000
     app.run(host="0.0.0.0", port=port, debug=False)
-else:
-    # когда процесс стартует через gunicorn – сразу поднимаем бота и планировщик
+elif __name__ != "__mp_main__" and multiprocessing.parent_process() is None:
+    # когда процесс стартует через gunicorn – сразу поднимаем бота и планировщик.
+    # Воркеры пула разбора (spawn/forkserver) импортируют main.py заново как
+    # __mp_main__ – в них бот и планировщик запускать нельзя.
     init_bot_and_scheduler()
@@ -0,0 +1,40 @@
+# monitor.py
+import asyncio
+import logging
+from contextlib import suppress
+from typing import Awaitable
+
+import config
+
+logger = logging.getLogger(__name__)
+
+
+async def watch_loop_lag(threshold_ms: int, interval: float = 0.05) -> None:
+    """
+    Периодически «засыпает» на `interval` секунд и сравнивает фактическую
+    паузу с ожидаемой. Если цикл проснулся позже чем на `threshold_ms` –
+    значит какой‑то callback блокировал event‑loop, пишем warning.
+    """
+    loop = asyncio.get_running_loop()
+    threshold = threshold_ms / 1000
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        lag = loop.time() - started - interval
+        if lag > threshold:
+            logger.warning(f"🐢 Event loop blocked for {lag * 1000:.0f} ms")
+
+
+async def run_with_lag_monitor(coro: Awaitable[None]) -> None:
+    """
+    Выполняет `coro`, параллельно запуская watch_loop_lag.
+    Монитор отменяется и дожидается завершения, чтобы в одноразовом
+    event‑loop из job_wrapper не оставалось висящих задач.
+    """
+    monitor = asyncio.create_task(watch_loop_lag(config.LOOP_LAG_WARN_MS))
+    try:
+        await coro
+    finally:
+        monitor.cancel()
+        with suppress(asyncio.CancelledError):
+            await monitor
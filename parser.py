@@ -2,13 +2,26 @@
 import asyncio
 import json
 import logging
+import multiprocessing
 import random
 import re
-from typing import List, Dict
+import signal
+from concurrent.futures import (
+    BrokenExecutor,
+    Executor,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from itertools import chain, islice
+from typing import AsyncIterator, Dict, Iterable, Iterator, List
 
 import httpx
 from bs4 import BeautifulSoup
 
+import config
+import database
+from database import filter_unpublished
+
 logger = logging.getLogger(__name__)
 
 HEADERS = {
@@ -66,6 +79,38 @@ def _extract_from_json(data: dict) -> List[Dict]:
     return found
 
 
+def _iter_from_json(data: dict) -> Iterator[Dict]:
+    """
+    Ленивый вариант _extract_from_json (тот же порядок обхода).
+    Стек итераторов вместо рекурсии: один генератор без вложенных
+    `yield from`, обход прекращается, как только потребитель остановился.
+    """
+    stack = [iter((data,))]
+    while stack:
+        for obj in stack[-1]:
+            if isinstance(obj, dict):
+                if "id" in obj and isinstance(obj.get("images"), dict):
+                    if obj.get("is_promoted"):
+                        continue
+                    images = obj["images"]
+                    for key in ("orig", "1200x", "736x", "474x"):
+                        if key in images:
+                            yield {
+                                "id": obj["id"],
+                                "url": images[key]["url"],
+                                "description": obj.get("description", ""),
+                                "is_promoted": False,
+                            }
+                            break
+                stack.append(iter(obj.values()))
+                break
+            if isinstance(obj, list):
+                stack.append(iter(obj))
+                break
+        else:
+            stack.pop()
+
+
 def _extract_from_html(soup: BeautifulSoup) -> List[Dict]:
     items = []
     for img in soup.find_all("img"):
@@ -94,43 +139,222 @@ def _extract_from_html(soup: BeautifulSoup) -> List[Dict]:
     return items
 
 
-async def get_pinterest_images(url: str) -> List[Dict]:
-    """
-    Возвращает список пинов из переданного URL.
-    """
-    try:
-        html = await _download_page(url)
-    except Exception as exc:
-        logger.error(f"Failed to download Pinterest page: {exc}")
-        return []
-
-    soup = BeautifulSoup(html, "html.parser")
-    results = []
-
-    # JSON‑скрипты
+def _load_json_payloads(soup: BeautifulSoup) -> List[dict]:
+    """Разбирает JSON из скриптов __PWS_DATA__ / __PWS_INITIAL_PROPS__."""
+    payloads = []
     json_scripts = soup.find_all(
         "script", id=re.compile(r"__PWS_(DATA|INITIAL_PROPS)__")
     )
     for script in json_scripts:
         try:
-            data = json.loads(script.string or "{}")
-            results.extend(_extract_from_json(data))
+            payloads.append(json.loads(script.string or "{}"))
         except Exception as exc:
             logger.debug(
                 f"JSON parsing error in script {script.get('id')}: {exc}"
             )
+    return payloads
+
+
+def _unique(pins: Iterable[Dict]) -> Iterator[Dict]:
+    """Убирает дубли (по id, иначе по url), сохраняя порядок."""
+    seen = set()
+    for item in pins:
+        key = item.get("id") or item.get("url")
+        if key and key not in seen:
+            seen.add(key)
+            yield item
+
+
+def _skip_published(pins: Iterable[Dict], batch_size: int) -> Iterator[Dict]:
+    """Отбрасывает опубликованные пины, проверяя базу пачками по `batch_size`."""
+    batch = []
+    for pin in pins:
+        batch.append(pin)
+        if len(batch) >= batch_size:
+            unpublished = filter_unpublished(p["id"] for p in batch)
+            yield from (p for p in batch if p["id"] in unpublished)
+            batch = []
+    if batch:
+        unpublished = filter_unpublished(p["id"] for p in batch)
+        yield from (p for p in batch if p["id"] in unpublished)
+
+
+def _parse_html(
+    html: str,
+    limit: int | None = None,
+    skip_published: bool = False,
+    batch_size: int = 20,
+) -> List[Dict]:
+    """
+    CPU‑bound часть: BeautifulSoup + json.loads + обход JSON.
+    Выполняется в пуле, поэтому возвращает только простые dict'ы
+    (без объектов soup), которые дёшево передать между процессами.
+
+    С `limit` JSON обходится лениво и обход прекращается, как только
+    набрано `limit` подходящих пинов.
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    payloads = _load_json_payloads(soup)
+
+    # JSON‑скрипты
+    if limit is None:
+        results = []
+        for data in payloads:
+            results.extend(_extract_from_json(data))
+        pins = iter(results)
+    else:
+        pins = (pin for data in payloads for pin in _iter_from_json(data))
 
     # Если JSON ничего не смог выдать – HTML
-    if not results:
+    first = next(pins, None)
+    if first is None:
         logger.info("JSON gave no pins → fallback to <img>")
-        results.extend(_extract_from_html(soup))
+        pins = iter(_extract_from_html(soup))
+    else:
+        pins = chain((first,), pins)
+
+    pins = _unique(pins)
+    if skip_published:
+        pins = _skip_published(pins, batch_size)
+    return list(islice(pins, limit))
+
+
+_parse_executor: Executor | None = None
+
+
+def _init_parse_worker(db_name: str) -> None:
+    """
+    Инициализация процесса‑воркера: обработчики SIGINT/SIGTERM из main.py
+    воркеру не нужны – завершением пула управляет родитель.
+    Путь к базе берём у родителя: spawn/forkserver импортируют database
+    заново, и изменённый в процессе DB_NAME иначе потеряется.
+    """
+    database.DB_NAME = db_name
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
 
-    # Убираем дубли
-    uniq = {}
-    for item in results:
-        key = item.get("id") or item.get("url")
-        if key and key not in uniq:
-            uniq[key] = item
 
-    logger.info(f"Found {len(uniq)} unique pins")
-    return list(uniq.values())
+def _get_parse_executor() -> Executor:
+    """
+    Лениво создаёт общий пул для разбора страниц.
+    Пул живёт на уровне модуля, т.к. job_wrapper создаёт новый event‑loop
+    на каждый запуск.
+
+    Процессы стартуют через forkserver/spawn, а не fork: пул создаётся из
+    потока APScheduler, а fork многопоточного процесса может зависнуть.
+    """
+    global _parse_executor
+    if _parse_executor is None:
+        if config.PARSE_EXECUTOR == "process":
+            methods = multiprocessing.get_all_start_methods()
+            method = "forkserver" if "forkserver" in methods else "spawn"
+            _parse_executor = ProcessPoolExecutor(
+                max_workers=config.PARSE_WORKERS,
+                mp_context=multiprocessing.get_context(method),
+                initializer=_init_parse_worker,
+                initargs=(database.DB_NAME,),
+            )
+        else:
+            _parse_executor = ThreadPoolExecutor(
+                max_workers=config.PARSE_WORKERS, thread_name_prefix="parse"
+            )
+        logger.info(f"Parse executor started: {config.PARSE_EXECUTOR}")
+    return _parse_executor
+
+
+def shutdown_parse_executor() -> None:
+    """Останавливает пул разбора (вызывается при graceful‑shutdown)."""
+    global _parse_executor
+    if _parse_executor is not None:
+        _parse_executor.shutdown(wait=False, cancel_futures=True)
+        _parse_executor = None
+
+
+async def _run_in_parse_executor(func, *args):
+    """
+    run_in_executor в пуле разбора. Если пул сломан (например, воркер убит
+    OOM‑killer'ом), пересоздаём его и повторяем один раз.
+    """
+    loop = asyncio.get_running_loop()
+    executor = _get_parse_executor()
+    try:
+        return await loop.run_in_executor(executor, func, *args)
+    except BrokenExecutor as exc:
+        logger.warning(f"Parse executor is broken, recreating: {exc}")
+        if _parse_executor is executor:
+            shutdown_parse_executor()
+        return await loop.run_in_executor(_get_parse_executor(), func, *args)
+
+
+async def get_pinterest_images(url: str) -> List[Dict]:
+    """
+    Возвращает список пинов из переданного URL.
+    Разбор страницы выполняется в пуле, не блокируя event‑loop.
+    """
+    try:
+        html = await _download_page(url)
+    except Exception as exc:
+        logger.error(f"Failed to download Pinterest page: {exc}")
+        return []
+
+    try:
+        pins = await _run_in_parse_executor(_parse_html, html)
+    except Exception as exc:
+        logger.error(f"Failed to parse Pinterest page: {exc}")
+        return []
+
+    logger.info(f"Found {len(pins)} unique pins")
+    return pins
+
+
+async def iter_pinterest_pins(
+    url: str,
+    limit: int | None = None,
+    batch_size: int = 20,
+    skip_published: bool = True,
+) -> AsyncIterator[Dict]:
+    """
+    Отдаёт уникальные пины страницы, пропуская уже опубликованные.
+
+    Обход JSON, удаление дублей и проверка базы (пачками по `batch_size`)
+    идут в пуле разбора одним проходом, и пины отдаются только после того,
+    как воркер закончил. Объём работы ограничивает только `limit`: обход
+    прекращается после `limit` свежих пинов. Прервать `async for` раньше
+    можно, но это ничего не экономит.
+    `skip_published=False` – без проверки базы.
+    """
+    try:
+        html = await _download_page(url)
+    except Exception as exc:
+        logger.error(f"Failed to download Pinterest page: {exc}")
+        return
+
+    try:
+        pins = await _run_in_parse_executor(
+            _parse_html,
+            html,
+            limit,
+            skip_published,
+            batch_size,
+        )
+    except Exception as exc:
+        logger.error(f"Failed to parse Pinterest page: {exc}")
+        return
+
+    for pin in pins:
+        yield pin
+
+
+async def pick_random_pin(url: str, k: int) -> Dict | None:
+    """
+    Выбирает случайный неопубликованный пин среди первых `k` свежих пинов
+    страницы (reservoir sampling, без перемешивания списка).
+    Разбор страницы останавливается после `k` кандидатов.
+    """
+    chosen = None
+    seen = 0
+    async for pin in iter_pinterest_pins(url, limit=k):
+        seen += 1
+        if random.randrange(seen) == 0:
+            chosen = pin
+    return chosen
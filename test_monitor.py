@@ -0,0 +1,39 @@
+import asyncio
+import logging
+import os
+import time
+
+os.environ.setdefault("BOT_TOKEN", "test-token")
+os.environ.setdefault("CHANNEL_ID", "-100123")
+
+import config
+import monitor
+
+
+def test_blocked_loop_is_reported_and_monitor_cleaned_up(monkeypatch, caplog):
+    monkeypatch.setattr(config, "LOOP_LAG_WARN_MS", 100)
+
+    async def blocking_job():
+        await asyncio.sleep(0.06)  # даём монитору стартовать
+        time.sleep(0.2)  # блокируем loop на 2 × порог
+        await asyncio.sleep(0.06)
+
+    async def run():
+        await monitor.run_with_lag_monitor(blocking_job())
+        # монитор отменён и дождан – других задач в loop не осталось
+        return asyncio.all_tasks() - {asyncio.current_task()}
+
+    with caplog.at_level(logging.WARNING, logger="monitor"):
+        leftover = asyncio.run(run())
+
+    assert leftover == set()
+    assert any("Event loop blocked" in r.getMessage() for r in caplog.records)
+
+
+def test_no_warning_without_blocking(monkeypatch, caplog):
+    monkeypatch.setattr(config, "LOOP_LAG_WARN_MS", 100)
+
+    with caplog.at_level(logging.WARNING, logger="monitor"):
+        asyncio.run(monitor.run_with_lag_monitor(asyncio.sleep(0.2)))
+
+    assert not caplog.records
@@ -0,0 +1,152 @@
+import asyncio
+import json
+import os
+import random
+from concurrent.futures import BrokenExecutor
+
+os.environ.setdefault("BOT_TOKEN", "test-token")
+os.environ.setdefault("CHANNEL_ID", "-100123")
+
+import pytest
+
+import config
+import database
+import parser
+
+
+def _data(pins):
+    return {
+        "resource": {
+            "data": [
+                {"id": pid, "images": {"orig": {"url": f"https://i.pinimg.com/{pid}.jpg"}}}
+                for pid in pins
+            ]
+        },
+        "ad": {"id": "ad", "images": {"orig": {"url": "x"}}, "is_promoted": True},
+    }
+
+
+def _page(pins):
+    return f'<html><script id="__PWS_DATA__">{json.dumps(_data(pins))}</script></html>'
+
+
+@pytest.fixture
+def page(monkeypatch, tmp_path):
+    """Стаб загрузки страницы + временная база + пул потоков."""
+    monkeypatch.setattr(database, "DB_NAME", str(tmp_path / "test.db"))
+    monkeypatch.setattr(config, "PARSE_EXECUTOR", "thread")
+    database.init_db()
+    parser.shutdown_parse_executor()
+    html = {}
+
+    async def download(url, timeout=15):
+        return html["text"]
+
+    monkeypatch.setattr(parser, "_download_page", download)
+    yield html
+    parser.shutdown_parse_executor()
+
+
+def _collect(**kwargs):
+    async def run():
+        return [pin["id"] async for pin in parser.iter_pinterest_pins("stub", **kwargs)]
+
+    return asyncio.run(run())
+
+
+def test_iter_from_json_matches_extract():
+    data = {"nested": [_data(["a", "b"]), {"x": _data(["a"])}]}
+    assert list(parser._iter_from_json(data)) == parser._extract_from_json(data)
+
+
+def test_iter_skips_published_and_duplicates(page):
+    page["text"] = _page(["1", "2", "1", "3", "4", "2"])
+    database.mark_as_published("2")
+    database.mark_as_published("4")
+    assert _collect(batch_size=2) == ["1", "3"]
+
+
+def test_filter_unpublished_matches_is_published_for_int_ids(page):
+    database.mark_as_published(123)
+    assert database.is_published(123)
+    assert database.filter_unpublished([123, 456, "123"]) == {456}
+
+
+def test_iter_stops_after_limit(page, monkeypatch):
+    page["text"] = _page([str(i) for i in range(1000)])
+    for i in range(10):
+        database.mark_as_published(str(i))
+    calls = []
+
+    def counting_filter(ids):
+        ids = list(ids)
+        calls.append(ids)
+        return database.filter_unpublished(ids)
+
+    monkeypatch.setattr(parser, "filter_unpublished", counting_filter)
+    assert _collect(limit=25, batch_size=20) == [str(i) for i in range(10, 35)]
+    # 2 пачки по 20 – дальше первых 40 пинов обход не идёт
+    assert [len(batch) for batch in calls] == [20, 20]
+
+
+def test_iter_falls_back_to_img(page):
+    page["text"] = '<img src="https://i.pinimg.com/236x/ab/cd.jpg" alt="x">'
+    assert _collect() == ["cd"]
+
+
+def test_iter_process_pool(page, monkeypatch):
+    monkeypatch.setattr(config, "PARSE_EXECUTOR", "process")
+    page["text"] = _page(["1", "2", "1", "3", "4"])
+    database.mark_as_published("2")
+    assert _collect(limit=2, batch_size=2) == ["1", "3"]
+
+
+def test_broken_process_pool_is_recreated(page, monkeypatch):
+    monkeypatch.setattr(config, "PARSE_EXECUTOR", "process")
+
+    async def kill_worker():
+        return await parser._run_in_parse_executor(os._exit, 1)
+
+    # воркер умирает и при повторе – ошибка наружу, но пул не «залипает»
+    with pytest.raises(BrokenExecutor):
+        asyncio.run(kill_worker())
+    page["text"] = _page(["1", "2"])
+    assert _collect(skip_published=False) == ["1", "2"]
+
+
+def test_pick_random_pin_uniform_over_first_k(monkeypatch):
+    random.seed(0)
+    k, trials = 5, 5000
+    limits = []
+
+    async def fake_iter(url, limit=None):
+        limits.append(limit)
+        for i in range(limit):
+            yield {"id": i}
+
+    monkeypatch.setattr(parser, "iter_pinterest_pins", fake_iter)
+
+    async def run():
+        return [(await parser.pick_random_pin("stub", k))["id"] for _ in range(trials)]
+
+    counts = {}
+    for pid in asyncio.run(run()):
+        counts[pid] = counts.get(pid, 0) + 1
+
+    assert set(limits) == {k}
+    assert set(counts) == set(range(k))
+    assert all(abs(n - trials / k) < 150 for n in counts.values())
+
+
+def test_pick_random_pin_from_page(page):
+    page["text"] = _page([str(i) for i in range(100)])
+    for i in range(10):
+        database.mark_as_published(str(i))
+    picked = {asyncio.run(parser.pick_random_pin("stub", 3))["id"] for _ in range(30)}
+    assert picked <= {"10", "11", "12"}
+
+
+def test_pick_random_pin_empty(page):
+    page["text"] = _page(["1"])
+    database.mark_as_published("1")
+    assert asyncio.run(parser.pick_random_pin("stub", 5)) is None